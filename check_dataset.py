@@ -6,210 +6,399 @@
 """
 
 import os
-import pandas as pd
-import numpy as np
+import sys
+import argparse
+import csv
+import io
+import multiprocessing
 from collections import Counter
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+import hashlib
+import heapq
 import json
-from pathlib import Path
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
 
-def check_directory_structure():
-    """Проверяет структуру директорий"""
-    print("=== ПРОВЕРКА СТРУКТУРЫ ДИРЕКТОРИЙ ===")
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Копия data_preparation.IMAGE_EXTENSIONS - держать в синхронизации. Не импортируем,
+# чтобы диагностика не загружала pandas и sklearn ради одной константы
+IMAGE_EXTENSIONS = frozenset({'.webp', '.jpg', '.jpeg', '.png'})
+
+@dataclass
+class DatasetStats:
+    """Счетчики датасета, собранные за один проход по CSV"""
+    total: int
+    card_counts: Counter
+    min_examples: int
+    max_examples: int
+    mean_examples: float
+    split_counts: Counter
+    set_counts: Optional[Counter] = None
+    aug_counts: Optional[Counter] = None
+    missing_files: Optional[List[str]] = None
+    
+    def to_report(self):
+        """Сводка для JSON отчета"""
+        summary = {
+            'total': self.total,
+            'unique_cards': len(self.card_counts),
+            'min_examples': self.min_examples,
+            'max_examples': self.max_examples,
+            'mean_examples': round(self.mean_examples, 2),
+            'split_counts': self.split_counts
+        }
+        if self.set_counts is not None:
+            summary['set_counts'] = self.set_counts
+        if self.aug_counts is not None:
+            summary['augmentation_types'] = self.aug_counts
+        return summary
+
+def count_images(path):
+    """Считает изображения в папке за один проход os.scandir"""
+    count = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            if (entry.is_file(follow_symlinks=False)
+                    and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS):
+                count += 1
+    return count
+
+def list_card_files(root):
+    """Возвращает множество относительных путей всех файлов в папке (рекурсивно)"""
+    files = set()
+    pending = ['']
+    while pending:
+        prefix = pending.pop()
+        with os.scandir(os.path.join(root, prefix)) as it:
+            for entry in it:
+                rel_path = os.path.join(prefix, entry.name) if prefix else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(rel_path)
+                else:
+                    files.add(rel_path)
+    return files
+
+SCAN_CACHE_FILE = './.cards_scan_cache.json'
+
+def _extensions_hash():
+    """Хэш набора расширений: при его изменении кэш сканирования недействителен"""
+    return hashlib.sha1(','.join(sorted(IMAGE_EXTENSIONS)).encode('utf-8')).hexdigest()
+
+def _load_scan_cache(cards_dir, cache_file=SCAN_CACHE_FILE):
+    """Возвращает кэш сканирования, если папка не менялась с момента его записи
+    
+    Проверка стоит O(число подпапок) вызовов stat вместо обхода всех файлов.
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if (cache.get('extensions_hash') != _extensions_hash()
+                or cache.get('cards_dir_mtime') != os.stat(cards_dir).st_mtime_ns):
+            return None
+        for name, info in cache['per_subdir'].items():
+            if os.stat(os.path.join(cards_dir, name)).st_mtime_ns != info['mtime']:
+                return None
+        return cache
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+def _save_scan_cache(cache, cache_file=SCAN_CACHE_FILE, out=None):
+    """Атомарно записывает кэш сканирования (tempfile + os.replace)"""
+    cache_dir = os.path.dirname(os.path.abspath(cache_file))
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.cards_scan_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        print(f" Не удалось сохранить кэш сканирования: {e}", file=out)
+
+def _scan_cards_dir(cards_dir):
+    """Полный обход папки с картами: изображения в корне и в каждой подпапке"""
+    # Время изменения берем до обхода, чтобы изменения во время сканирования
+    # сделали кэш недействительным при следующем запуске
+    cache = {
+        'cards_dir_mtime': os.stat(cards_dir).st_mtime_ns,
+        'extensions_hash': _extensions_hash(),
+        'root_images': 0,
+        'per_subdir': {}
+    }
+    # Один проход os.scandir по корню: подпапки и изображения в корне
+    subdirs = []
+    with os.scandir(cards_dir) as it:
+        for entry in it:
+            if entry.is_dir():
+                subdirs.append(entry)
+            elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                cache['root_images'] += 1
+    
+    for subdir in subdirs:
+        mtime = subdir.stat().st_mtime_ns
+        cache['per_subdir'][subdir.name] = {'mtime': mtime, 'count': count_images(subdir.path)}
+    return cache
+
+def check_directory_structure(use_cache=True, out=None):
+    """Проверяет структуру директорий
+    
+    Результаты обхода кэшируются в SCAN_CACHE_FILE; повторный обход выполняется
+    только если изменилось время модификации папки cards или одной из подпапок.
+    out - поток для вывода (по умолчанию sys.stdout).
+    """
+    print("=== ПРОВЕРКА СТРУКТУРЫ ДИРЕКТОРИЙ ===", file=out)
     
     # Проверяем основную папку с картами
     cards_dir = './cards'
     if not os.path.exists(cards_dir):
-        print(" Папка './cards' не найдена!")
+        print(" Папка './cards' не найдена!", file=out)
         return False
     
-    print(f"Папка '{cards_dir}' найдена")
-    
-    # Проверяем подпапки
-    subdirs = [d for d in os.listdir(cards_dir) if os.path.isdir(os.path.join(cards_dir, d))]
+    print(f"Папка '{cards_dir}' найдена", file=out)
     
-    # Проверяем изображения в корне папки
-    root_images = [f for f in os.listdir(cards_dir) 
-                   if f.lower().endswith(('.webp', '.jpg', '.jpeg', '.png'))]
+    scan = _load_scan_cache(cards_dir) if use_cache else None
+    if scan is not None:
+        print(" Папка не изменилась, используются результаты прошлого сканирования", file=out)
+    else:
+        scan = _scan_cards_dir(cards_dir)
+        if use_cache:
+            _save_scan_cache(scan, out=out)
     
+    subdirs = scan['per_subdir']
+    root_images = scan['root_images']
     total_files = 0
     
     if len(subdirs) > 0:
-        print(f" Найдено подпапок: {len(subdirs)}")
-        for subdir in subdirs:
-            subdir_path = os.path.join(cards_dir, subdir)
-            files = [f for f in os.listdir(subdir_path) if f.lower().endswith(('.webp', '.jpg', '.jpeg', '.png'))]
-            total_files += len(files)
-            print(f"    {subdir}: {len(files)} файлов")
-    
-    if len(root_images) > 0:
-        total_files += len(root_images)
-        print(f"📄 В корне папки: {len(root_images)} изображений")
+        print(f" Найдено подпапок: {len(subdirs)}", file=out)
+        for name, info in subdirs.items():
+            total_files += info['count']
+            print(f"    {name}: {info['count']} файлов", file=out)
+    
+    if root_images > 0:
+        total_files += root_images
+        print(f"📄 В корне папки: {root_images} изображений", file=out)
         
         if len(subdirs) == 0:
-            print(" Изображения находятся в корне папки cards")
-            print(" Для организации по классам запустите: python organize_cards.py")
+            print(" Изображения находятся в корне папки cards", file=out)
+            print(" Для организации по классам запустите: python organize_cards.py", file=out)
     
-    print(f" Всего изображений: {total_files}")
+    print(f" Всего изображений: {total_files}", file=out)
     
     if total_files == 0:
-        print(" Изображения не найдены!")
+        print(" Изображения не найдены!", file=out)
         return False
     
     return True
 
-def check_base_dataset():
-    """Проверяет базовый датасет"""
-    print("\n=== ПРОВЕРКА БАЗОВОГО ДАТАСЕТА ===")
-    
-    csv_file = './cards_dataset.csv'
-    if not os.path.exists(csv_file):
-        print(" Файл 'cards_dataset.csv' не найден!")
-        return False, None
-    
-    try:
-        df = pd.read_csv(csv_file)
-        print(f" Файл '{csv_file}' загружен")
-        print(f" Всего записей: {len(df)}")
+def _scan_csv(csv_file, files_root=None, out=None):
+    """Читает CSV потоково и собирает DatasetStats
+    
+    files_root - папка, относительно которой проверяется наличие файлов из CSV.
+    Возвращает None, если структура CSV некорректна или он пуст.
+    """
+    # Для диагностики нужны только счетчики, поэтому весь файл в памяти не держим.
+    # utf-8-sig снимает BOM, который добавляет Excel, как это делал pandas
+    with open(csv_file, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        cols = frozenset(columns)
         
         # Проверяем структуру
         required_columns = ['filename', 'card_name', 'set_name', 'split']
         # Проверяем наличие поля filepath (новая структура)
-        if 'filepath' in df.columns:
-            print(" Обнаружена новая структура данных с полем 'filepath'")
+        if 'filepath' in cols:
+            print(" Обнаружена новая структура данных с полем 'filepath'", file=out)
             required_columns.append('filepath')
         
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in required_columns if col not in cols]
         
         if missing_columns:
-            print(f" Отсутствуют столбцы: {missing_columns}")
-            return False, None
+            print(f" Отсутствуют столбцы: {missing_columns}", file=out)
+            return None
+        
+        print(f" Все необходимые столбцы присутствуют: {list(columns)}", file=out)
+        
+        has_set = 'set' in cols
+        has_aug_type = 'augmentation_type' in cols
+        card_counts = Counter()
+        split_counts = Counter()
+        set_counts = Counter() if has_set else None
+        aug_counts = Counter() if has_aug_type else None
         
-        print(f" Все необходимые столбцы присутствуют: {list(df.columns)}")
+        # Множество существующих файлов строим одним обходом папки,
+        # после чего проверка каждой строки - это поиск в множестве
+        existing_files = list_card_files(files_root) if files_root else None
+        missing_files = []
+        
+        # Из каждой строки берем только нужные столбцы по индексу,
+        # не собирая словарь из всех полей
+        card_idx = columns.index('card_name')
+        split_idx = columns.index('split')
+        filename_idx = columns.index('filename')
+        filepath_idx = columns.index('filepath') if 'filepath' in cols else None
+        set_idx = columns.index('set') if has_set else None
+        aug_idx = columns.index('augmentation_type') if has_aug_type else None
+        
+        total = 0
+        num_columns = len(columns)
+        for row in reader:
+            # Как DictReader: пустые строки пропускаем, недостающие поля - None
+            if not row:
+                continue
+            if len(row) < num_columns:
+                row = row + [None] * (num_columns - len(row))
+            total += 1
+            card_counts[row[card_idx]] += 1
+            split_counts[row[split_idx]] += 1
+            if has_set:
+                set_counts[row[set_idx]] += 1
+            if has_aug_type:
+                aug_counts[row[aug_idx]] += 1
+            if existing_files is not None:
+                # Используем filepath если есть, иначе filename
+                filepath = row[filepath_idx] if filepath_idx is not None else ''
+                rel_path = os.path.normpath(filepath or row[filename_idx] or '')
+                if rel_path not in existing_files:
+                    missing_files.append(os.path.join(files_root, rel_path))
+    
+    print(f" Всего записей: {total}", file=out)
+    if total == 0:
+        print(" Датасет пуст!", file=out)
+        return None
+    
+    return DatasetStats(
+        total=total,
+        card_counts=card_counts,
+        min_examples=min(card_counts.values()),
+        max_examples=max(card_counts.values()),
+        mean_examples=total / len(card_counts),
+        split_counts=split_counts,
+        set_counts=set_counts,
+        aug_counts=aug_counts,
+        missing_files=missing_files if existing_files is not None else None
+    )
+
+def check_base_dataset(out=None):
+    """Проверяет базовый датасет"""
+    print("\n=== ПРОВЕРКА БАЗОВОГО ДАТАСЕТА ===", file=out)
+    
+    csv_file = './cards_dataset.csv'
+    if not os.path.exists(csv_file):
+        print(" Файл 'cards_dataset.csv' не найден!", file=out)
+        return False, None
+    
+    try:
+        print(f" Файл '{csv_file}' загружен", file=out)
+        stats = _scan_csv(csv_file, files_root='./cards', out=out)
+        if stats is None:
+            return False, None
         
         # Проверяем распределение по сплитам
-        split_counts = df['split'].value_counts()
-        print("\n📈 Распределение по сплитам:")
-        for split, count in split_counts.items():
-            percentage = (count / len(df)) * 100
-            print(f"   {split}: {count} ({percentage:.1f}%)")
+        print("\n📈 Распределение по сплитам:", file=out)
+        for split, count in stats.split_counts.most_common():
+            percentage = (count / stats.total) * 100
+            print(f"   {split}: {count} ({percentage:.1f}%)", file=out)
         
         # Проверяем уникальные карты
-        unique_cards = df['card_name'].nunique()
-        print(f"\n🃏 Уникальных карт: {unique_cards}")
+        print(f"\n🃏 Уникальных карт: {len(stats.card_counts)}", file=out)
         
         # Проверяем распределение по картам
-        card_counts = df['card_name'].value_counts()
-        print(f" Среднее количество примеров на карту: {card_counts.mean():.1f}")
-        print(f" Минимальное количество примеров: {card_counts.min()}")
-        print(f" Максимальное количество примеров: {card_counts.max()}")
+        print(f" Среднее количество примеров на карту: {stats.mean_examples:.1f}", file=out)
+        print(f" Минимальное количество примеров: {stats.min_examples}", file=out)
+        print(f" Максимальное количество примеров: {stats.max_examples}", file=out)
         
         # Проверяем карты с малым количеством примеров
-        low_count_cards = card_counts[card_counts < 5]
-        if len(low_count_cards) > 0:
-            print(f"\n  Карты с менее чем 5 примерами ({len(low_count_cards)} карт):")
-            for card, count in low_count_cards.head(10).items():
-                print(f"   {card}: {count} примеров")
-            if len(low_count_cards) > 10:
-                print(f"   ... и еще {len(low_count_cards) - 10} карт")
+        # Полная сортировка не нужна: берем 10 наименьших через кучу
+        card_counts = stats.card_counts
+        low_count_total = sum(1 for count in card_counts.values() if count < 5)
+        if low_count_total > 0:
+            print(f"\n  Карты с менее чем 5 примерами ({low_count_total} карт):", file=out)
+            for card, count in heapq.nsmallest(10, card_counts.items(), key=itemgetter(1)):
+                if count >= 5:
+                    break
+                print(f"   {card}: {count} примеров", file=out)
+            if low_count_total > 10:
+                print(f"   ... и еще {low_count_total - 10} карт", file=out)
         
         # Проверяем существование файлов
-        missing_files = []
-        for _, row in df.head(20).iterrows():  # Проверяем только первые 20 для скорости
-            # Используем filepath если есть, иначе filename
-            if 'filepath' in df.columns and pd.notna(row['filepath']):
-                file_path = os.path.join('./cards', row['filepath'])
-            else:
-                file_path = os.path.join('./cards', row['filename'])
-            
-            if not os.path.exists(file_path):
-                missing_files.append(file_path)
-        
+        missing_files = stats.missing_files
         if missing_files:
-            print(f"\n Не найдены файлы (проверено первые 20):")
-            for file in missing_files:
-                print(f"   {file}")
+            print(f"\n Не найдены файлы ({len(missing_files)} из {stats.total}):", file=out)
+            for file in missing_files[:20]:
+                print(f"   {file}", file=out)
+            if len(missing_files) > 20:
+                print(f"   ... и еще {len(missing_files) - 20} файлов", file=out)
         else:
-            print("\n Файлы существуют (проверено первые 20)")
+            print(f"\n Все файлы существуют (проверено {stats.total})", file=out)
         
-        return True, df
+        return True, stats
         
     except Exception as e:
-        print(f" Ошибка при загрузке датасета: {e}")
+        print(f" Ошибка при загрузке датасета: {e}", file=out)
         return False, None
 
-def check_augmented_dataset():
+def check_augmented_dataset(out=None):
     """Проверяет аугментированный датасет"""
-    print("\n=== ПРОВЕРКА АУГМЕНТИРОВАННОГО ДАТАСЕТА ===")
+    print("\n=== ПРОВЕРКА АУГМЕНТИРОВАННОГО ДАТАСЕТА ===", file=out)
     
     csv_file = 'augmented_cards_dataset.csv'
     aug_dir = './cards_augmented'
     
     if not os.path.exists(csv_file):
-        print(f" Файл '{csv_file}' не найден")
-        print(" Запустите: python data_augmentation.py")
+        print(f" Файл '{csv_file}' не найден", file=out)
+        print(" Запустите: python data_augmentation.py", file=out)
         return False, None
     
     if not os.path.exists(aug_dir):
-        print(f" Папка '{aug_dir}' не найдена")
-        print(" Запустите: python data_augmentation.py")
+        print(f" Папка '{aug_dir}' не найдена", file=out)
+        print(" Запустите: python data_augmentation.py", file=out)
         return False, None
     
-    print(f" Аугментированный датасет найден")
+    print(f" Аугментированный датасет найден", file=out)
     
     try:
-        df = pd.read_csv(csv_file)
-        print(f" Записей в аугментированном датасете: {len(df)}")
-        
-        # Проверяем структуру
-        required_columns = ['filename', 'card_name', 'set_name', 'split']
-        # Проверяем наличие поля filepath (новая структура)
-        if 'filepath' in df.columns:
-            print(" Обнаружена новая структура данных с полем 'filepath'")
-            required_columns.append('filepath')
-        
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            print(f" Отсутствуют столбцы: {missing_columns}")
+        stats = _scan_csv(csv_file, out=out)
+        if stats is None:
             return False, None
         
-        print(f" Все необходимые столбцы присутствуют: {list(df.columns)}")
-        
         # Проверяем распределение по картам
-        if 'card_name' in df.columns:
-            card_counts = df['card_name'].value_counts()
-            min_count = card_counts.min()
-            max_count = card_counts.max()
-            
-            print(f" Минимум примеров на карту: {min_count}")
-            print(f" Максимум примеров на карту: {max_count}")
-            print(f" Среднее примеров на карту: {card_counts.mean():.1f}")
-            
-            if min_count < 2:
-                problem_cards = card_counts[card_counts < 2]
-                print(f"\n  ПРОБЛЕМА: {len(problem_cards)} карт все еще с единичными примерами")
-                print(" Увеличьте количество аугментаций в data_augmentation.py")
-                return False, None
-            else:
-                print("\n Все карты имеют достаточно примеров для обучения")
+        print(f" Минимум примеров на карту: {stats.min_examples}", file=out)
+        print(f" Максимум примеров на карту: {stats.max_examples}", file=out)
+        print(f" Среднее примеров на карту: {stats.mean_examples:.1f}", file=out)
+        
+        if stats.min_examples < 2:
+            problem_cards = [card for card, count in stats.card_counts.items() if count < 2]
+            print(f"\n  ПРОБЛЕМА: {len(problem_cards)} карт все еще с единичными примерами", file=out)
+            print(" Увеличьте количество аугментаций в data_augmentation.py", file=out)
+            return False, None
+        else:
+            print("\n Все карты имеют достаточно примеров для обучения", file=out)
         
         # Проверяем типы аугментации
-        if 'augmentation_type' in df.columns:
-            aug_types = df['augmentation_type'].value_counts()
-            print("\n Типы аугментации:")
-            for aug_type, count in aug_types.items():
-                print(f"   {aug_type}: {count} изображений")
+        if stats.aug_counts is not None:
+            print("\n Типы аугментации:", file=out)
+            for aug_type, count in stats.aug_counts.most_common():
+                print(f"   {aug_type}: {count} изображений", file=out)
         
-        return True, df
+        return True, stats
         
     except Exception as e:
-        print(f" Ошибка при чтении аугментированного датасета: {e}")
+        print(f" Ошибка при чтении аугментированного датасета: {e}", file=out)
         return False, None
 
-def check_model_files():
+def check_model_files(out=None):
     """Проверяет наличие файлов модели"""
-    print("\n=== ПРОВЕРКА ФАЙЛОВ МОДЕЛИ ===")
+    print("\n=== ПРОВЕРКА ФАЙЛОВ МОДЕЛИ ===", file=out)
     
     model_files = [
         'berserk_card_model_augmented.tflite',
@@ -223,96 +412,182 @@ def check_model_files():
         if os.path.exists(file):
             size = os.path.getsize(file)
             if file.endswith('.png'):
-                print(f" {file} ({size} байт)")
+                print(f" {file} ({size} байт)", file=out)
             else:
-                print(f" {file} ({size / 1024 / 1024:.1f} MB)")
+                print(f" {file} ({size / 1024 / 1024:.1f} MB)", file=out)
             found_files.append(file)
         else:
-            print(f" {file} не найден")
+            print(f" {file} не найден", file=out)
     
     if len(found_files) == 0:
-        print(" Запустите: python train_model_augmented.py")
+        print(" Запустите: python train_model_augmented.py", file=out)
     elif len(found_files) < len(model_files):
-        print("  Некоторые файлы модели отсутствуют")
+        print("  Некоторые файлы модели отсутствуют", file=out)
     else:
-        print(" Все файлы модели найдены")
+        print(" Все файлы модели найдены", file=out)
     
     return found_files
 
-def plot_dataset_statistics(df_base, df_aug):
-    """Строит графики статистики датасета"""
+def plot_dataset_statistics(base_stats, aug_stats, dpi=120, show=None):
+    """Строит графики статистики датасета
+    
+    show=None - показывать окно только при интерактивном запуске (stdout - терминал)
+    """
     print("\n=== ПОСТРОЕНИЕ ГРАФИКОВ ===")
     
+    # matplotlib нужен только для графиков, поэтому импортируем его здесь.
+    # Без дисплея используем Agg, чтобы не инициализировать GUI backend
+    import matplotlib
+    headless = (sys.platform.startswith('linux')
+                and not os.environ.get('DISPLAY')
+                and not os.environ.get('WAYLAND_DISPLAY'))
+    if show is None:
+        show = sys.stdout.isatty()
+    if headless or not show:
+        show = False
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
     fig.suptitle('Статистика датасета карт Berserk TCG', fontsize=16)
     
     # График 1: Распределение по сетам (базовый датасет)
-    if df_base is not None and 'set' in df_base.columns:
-        set_counts = df_base['set'].value_counts()
-        axes[0, 0].bar(set_counts.index, set_counts.values)
+    if base_stats is not None and base_stats.set_counts:
+        sets, counts = zip(*base_stats.set_counts.most_common())
+        axes[0, 0].bar(sets, counts)
         axes[0, 0].set_title('Распределение по сетам (базовый датасет)')
         axes[0, 0].set_xlabel('Сет')
         axes[0, 0].set_ylabel('Количество карт')
         axes[0, 0].tick_params(axis='x', rotation=45)
     
     # График 2: Распределение примеров на карту (базовый)
-    if df_base is not None and 'card_name' in df_base.columns:
-        card_counts = df_base['card_name'].value_counts()
-        axes[0, 1].hist(card_counts.values, bins=20, alpha=0.7, color='blue')
+    if base_stats is not None:
+        axes[0, 1].hist(list(base_stats.card_counts.values()), bins=20, alpha=0.7, color='blue', rasterized=True)
         axes[0, 1].set_title('Распределение примеров на карту (базовый)')
         axes[0, 1].set_xlabel('Количество примеров')
         axes[0, 1].set_ylabel('Количество карт')
     
     # График 3: Распределение по сетам (аугментированный датасет)
-    if df_aug is not None and 'set' in df_aug.columns:
-        set_counts_aug = df_aug['set'].value_counts()
-        axes[1, 0].bar(set_counts_aug.index, set_counts_aug.values, color='orange')
+    if aug_stats is not None and aug_stats.set_counts:
+        sets, counts = zip(*aug_stats.set_counts.most_common())
+        axes[1, 0].bar(sets, counts, color='orange')
         axes[1, 0].set_title('Распределение по сетам (аугментированный)')
         axes[1, 0].set_xlabel('Сет')
         axes[1, 0].set_ylabel('Количество изображений')
         axes[1, 0].tick_params(axis='x', rotation=45)
     
     # График 4: Распределение примеров на карту (аугментированный)
-    if df_aug is not None and 'card_name' in df_aug.columns:
-        card_counts_aug = df_aug['card_name'].value_counts()
-        axes[1, 1].hist(card_counts_aug.values, bins=20, alpha=0.7, color='orange')
+    if aug_stats is not None:
+        axes[1, 1].hist(list(aug_stats.card_counts.values()), bins=20, alpha=0.7, color='orange', rasterized=True)
         axes[1, 1].set_title('Распределение примеров на карту (аугментированный)')
         axes[1, 1].set_xlabel('Количество примеров')
         axes[1, 1].set_ylabel('Количество карт')
     
     plt.tight_layout()
-    plt.savefig('dataset_statistics.png', dpi=300, bbox_inches='tight')
+    plt.savefig('dataset_statistics.png', dpi=dpi, bbox_inches='tight')
     print("Графики сохранены в dataset_statistics.png")
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
+
+def _plot_entry(base_stats, aug_stats, dpi):
+    """Точка входа фонового процесса построения графиков"""
+    # Вывод дочернего процесса перемешался бы с итоговыми рекомендациями
+    with open(os.devnull, 'w') as devnull:
+        sys.stdout = devnull
+        try:
+            plot_dataset_statistics(base_stats, aug_stats, dpi=dpi, show=False)
+        except Exception as e:
+            print(f" Не удалось построить графики: {e}", file=sys.stderr)
+            sys.exit(1)
+
+def generate_report(base_stats, aug_stats, report_file='dataset_report.json'):
+    """Формирует итоговый отчет с рекомендациями и сохраняет его в JSON"""
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'base_dataset': None,
+        'augmented_dataset': None,
+        'recommendations': []
+    }
+    
+    if base_stats is None:
+        report['recommendations'].append(
+            "Создайте базовый датасет: python data_preparation.py")
+    else:
+        report['base_dataset'] = base_stats.to_report()
+        if base_stats.min_examples < 5:
+            report['recommendations'].append(
+                "Есть карты с менее чем 5 примерами - используйте аугментацию")
+    
+    if aug_stats is None:
+        report['recommendations'].append(
+            "Создайте аугментированный датасет: python data_augmentation.py")
+    else:
+        report['augmented_dataset'] = aug_stats.to_report()
+    
+    # Счетчики сериализуются напрямую, без промежуточных структур
+    if ORJSON_AVAILABLE:
+        with open(report_file, 'wb') as f:
+            f.write(orjson.dumps(report))
+    else:
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, separators=(',', ':'))
+    
+    return report
 
-def main():
+def main(show_plots=None, dpi=120, use_cache=True, wait_for_plot=False):
     """Основная функция проверки"""
     print("ДИАГНОСТИКА ДАТАСЕТА КАРТ BERSERK TCG")
     print("=" * 50)
     
+    # Проверки независимы и упираются в диск, поэтому запускаем их параллельно.
+    # Каждая пишет в свой буфер, буферы печатаются в фиксированном порядке
+    dir_out, base_out, aug_out, model_out = (io.StringIO() for _ in range(4))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        f_dir = executor.submit(check_directory_structure, use_cache=use_cache, out=dir_out)
+        f_base = executor.submit(check_base_dataset, out=base_out)
+        f_aug = executor.submit(check_augmented_dataset, out=aug_out)
+        f_model = executor.submit(check_model_files, out=model_out)
+    
     # Проверяем структуру директорий
-    if not check_directory_structure():
+    dir_ok = f_dir.result()
+    print(dir_out.getvalue(), end='')
+    if not dir_ok:
         print("\n Критическая ошибка: проблемы со структурой директорий")
         return
     
     # Проверяем базовый датасет
-    base_success, df_base = check_base_dataset()
+    base_success, base_stats = f_base.result()
+    print(base_out.getvalue(), end='')
     
     # Проверяем аугментированный датасет
-    aug_success, df_aug = check_augmented_dataset()
+    aug_success, aug_stats = f_aug.result()
+    print(aug_out.getvalue(), end='')
     
     # Проверяем файлы модели
-    model_files = check_model_files()
-    
-    # Строим графики если есть данные
-    if (base_success and df_base is not None) or (aug_success and df_aug is not None):
-        try:
-            plot_dataset_statistics(df_base if base_success else None, df_aug if aug_success else None)
-        except Exception as e:
-            print(f" Не удалось построить графики: {e}")
+    model_files = f_model.result()
+    print(model_out.getvalue(), end='')
+    
+    # Строим графики если есть данные. Окно с графиками требует текущего процесса,
+    # иначе рендеринг и сохранение PNG уходят в фоновый процесс
+    plot_process = None
+    if base_success or aug_success:
+        if show_plots is None:
+            show_plots = sys.stdout.isatty()
+        if show_plots:
+            try:
+                plot_dataset_statistics(base_stats, aug_stats, dpi=dpi, show=True)
+            except Exception as e:
+                print(f" Не удалось построить графики: {e}")
+        else:
+            print("\n=== ПОСТРОЕНИЕ ГРАФИКОВ ===")
+            print(" Графики строятся в фоновом процессе")
+            plot_process = multiprocessing.Process(target=_plot_entry,
+                                                   args=(base_stats, aug_stats, dpi))
+            plot_process.start()
     
     # Генерируем отчет
-    report = generate_report(df_base if base_success else None, df_aug if aug_success else None)
+    report = generate_report(base_stats, aug_stats)
     
     # Итоговые рекомендации
     print("\n" + "=" * 50)
@@ -324,11 +599,30 @@ def main():
         for i, rec in enumerate(report['recommendations'], 1):
             print(f"{i}. {rec}")
     
+    if plot_process is not None and wait_for_plot:
+        plot_process.join()
+        if plot_process.exitcode == 0:
+            print("\nГрафики сохранены в dataset_statistics.png")
+    
     print("\n Подробная информация сохранена в:")
-    if os.path.exists('dataset_statistics.png'):
+    print("   - dataset_report.json (отчет)")
+    if plot_process is not None and plot_process.is_alive():
+        print("   - dataset_statistics.png (графики, строятся в фоне)")
+    elif os.path.exists('dataset_statistics.png'):
         print("   - dataset_statistics.png (графики)")
     
     print("\n Удачи в обучении модели!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Диагностика датасета карт Berserk TCG')
+    parser.add_argument('--show', action='store_true', default=None,
+                        help='Показать окно с графиками')
+    parser.add_argument('--dpi', type=int, default=120,
+                        help='Разрешение сохраняемых графиков')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Пересканировать папку с картами, игнорируя кэш')
+    parser.add_argument('--wait-for-plot', action='store_true',
+                        help='Дождаться завершения фонового построения графиков')
+    args = parser.parse_args()
+    main(show_plots=args.show, dpi=args.dpi, use_cache=not args.no_cache,
+         wait_for_plot=args.wait_for_plot)
\ No newline at end of file
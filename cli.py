@@ -8,8 +8,38 @@ CLI интерфейс для проекта Berserk TCG TFLite
 import argparse
 import os
 import sys
+import time
 from pathlib import Path
 
+# Сколько секунд результат подсчета файлов считается актуальным
+SCAN_TTL = 5.0
+_scan_cache = {}
+
+def count_files(root, suffix='.webp'):
+    """Рекурсивно считает файлы с расширением suffix
+    
+    Один обход os.scandir без fnmatch; результат кэшируется на SCAN_TTL секунд,
+    чтобы команды пайплайна не обходили одни и те же папки повторно.
+    """
+    key = (root, suffix)
+    now = time.monotonic()
+    cached = _scan_cache.get(key)
+    if cached is not None and now - cached[0] < SCAN_TTL:
+        return cached[1]
+    
+    count = 0
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.lower().endswith(suffix):
+                    count += 1
+    
+    _scan_cache[key] = (now, count)
+    return count
+
 def check_environment():
     """Проверяет готовность окружения"""
     print("🔍 Проверка окружения...")
@@ -27,12 +57,12 @@ def check_environment():
         return False
     
     # Подсчитываем карты
-    card_files = list(Path("cards").glob("**/*.webp"))
-    if len(card_files) == 0:
+    card_count = count_files("cards")
+    if card_count == 0:
         print("❌ В папке 'cards' нет файлов .webp")
         return False
     
-    print(f"✅ Найдено {len(card_files)} изображений карт")
+    print(f"✅ Найдено {card_count} изображений карт")
     return True
 
 def check_augmented_data():
@@ -41,10 +71,9 @@ def check_augmented_data():
         return False
     
     # Проверяем наличие файлов в новой структуре (cards_augmented/<set>/<variant>/)
-    augmented_files = list(Path("cards_augmented").rglob("*.webp"))
     csv_file = Path("cards_augmented/augmented_dataset.csv")
     
-    return len(augmented_files) > 0 and csv_file.exists()
+    return csv_file.exists() and count_files("cards_augmented") > 0
 
 def create_augmented_data():
     """Создает аугментированный датасет"""
@@ -73,6 +102,8 @@ def create_augmented_data():
         
         # Создаем аугментированный датасет
         aug_df = augmentator.create_augmented_dataset(mode='full')
+        # Содержимое cards_augmented изменилось, прежний подсчет неактуален
+        _scan_cache.clear()
         
         if not aug_df.empty:
             # Обновляем CSV и создаем энкодеры
@@ -12,10 +12,13 @@ import argparse
 import json
 import hashlib
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 
 import numpy as np
 import pandas as pd
@@ -30,7 +33,27 @@ except ImportError:
     ALBUMENTATIONS_AVAILABLE = False
     print("Warning: albumentations не установлен. Используются базовые аугментации.")
 
-from data_preparation import BerserkCardDataset
+from data_preparation import BerserkCardDataset, IMAGE_EXTENSIONS
+
+
+def linear_lut(scale: float, offset: float) -> np.ndarray:
+    """Таблица uint8 -> uint8 для clip(x * scale + offset, 0, 255)
+    
+    Яркость и контраст - поэлементные преобразования 256 возможных значений,
+    поэтому вместо арифметики над всем изображением считаем 256 значений
+    и применяем их одним проходом cv2.LUT.
+    """
+    lut = np.arange(256, dtype=np.float32)
+    np.multiply(lut, np.float32(scale), out=lut)
+    np.add(lut, np.float32(offset), out=lut)
+    np.clip(lut, 0, 255, out=lut)
+    return lut.astype(np.uint8)
+
+
+def image_mean(image: np.ndarray) -> float:
+    """Среднее по всем пикселям и каналам через SIMD-реализацию cv2.mean"""
+    channels = image.shape[2] if image.ndim == 3 else 1
+    return sum(cv2.mean(image)[:channels]) / channels
 
 
 @dataclass
@@ -38,10 +61,12 @@ class AugmentationConfig:
     """Конфигурация аугментации"""
     num_augmentations: int = 4
     image_quality: int = 95
+    webp_method: int = 0  # 0 - быстрое кодирование, 6 - минимальный размер
     target_size: Tuple[int, int] = (224, 224)
     augmentation_types: List[str] = None
     use_albumentations: bool = True
     seed: int = 42
+    num_workers: int = 0  # 0 - по числу ядер
     
     def __post_init__(self):
         if self.augmentation_types is None:
@@ -84,6 +109,12 @@ class AdvancedDataAugmentator:
         # Загрузка состояния
         self.state = self.load_state()
         
+        # Листинги папок для проверки существования файлов (папка -> имена)
+        self._listing_cache: Dict[Path, set] = {}
+        
+        # Свой генератор случайных чисел у каждого потока-обработчика
+        self._rng_local = threading.local()
+        
     def setup_logging(self):
         """Настройка логирования"""
         log_format = '%(asctime)s - %(levelname)s - %(message)s'
@@ -140,9 +171,20 @@ class AdvancedDataAugmentator:
             'combined': self._combined_basic
         }
     
+    def _rng(self) -> np.random.Generator:
+        """Генератор случайных чисел текущего потока
+        
+        Создается один раз на поток из энтропии ОС, поэтому варианты
+        остаются случайными без пересева перед каждой аугментацией.
+        """
+        rng = getattr(self._rng_local, 'rng', None)
+        if rng is None:
+            rng = self._rng_local.rng = np.random.default_rng()
+        return rng
+    
     def _rotate_basic(self, image: np.ndarray) -> np.ndarray:
         """Базовый поворот"""
-        angle = np.random.uniform(-15, 15)
+        angle = self._rng().uniform(-15, 15)
         h, w = image.shape[:2]
         center = (w // 2, h // 2)
         matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
@@ -150,27 +192,36 @@ class AdvancedDataAugmentator:
     
     def _brightness_basic(self, image: np.ndarray) -> np.ndarray:
         """Базовое изменение яркости"""
-        factor = np.random.uniform(0.8, 1.2)
-        return np.clip(image * factor, 0, 255).astype(np.uint8)
+        factor = self._rng().uniform(0.8, 1.2)
+        return cv2.LUT(image, linear_lut(factor, 0.0))
     
     def _contrast_basic(self, image: np.ndarray) -> np.ndarray:
         """Базовое изменение контраста"""
-        factor = np.random.uniform(0.8, 1.2)
-        mean = image.mean()
-        return np.clip((image - mean) * factor + mean, 0, 255).astype(np.uint8)
+        factor = self._rng().uniform(0.8, 1.2)
+        mean = image_mean(image)
+        # (image - mean) * factor + mean == image * factor + mean * (1 - factor)
+        return cv2.LUT(image, linear_lut(factor, mean * (1 - factor)))
     
     def _saturation_basic(self, image: np.ndarray) -> np.ndarray:
         """Базовое изменение насыщенности"""
         hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-        factor = np.random.uniform(0.8, 1.2)
-        hsv[:, :, 1] = np.clip(hsv[:, :, 1] * factor, 0, 255)
-        return cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+        factor = self._rng().uniform(0.8, 1.2)
+        # Насыщенность масштабируем таблицей, без float-копии канала S
+        h, s, v = cv2.split(hsv)
+        s = cv2.LUT(s, linear_lut(factor, 0.0))
+        return cv2.cvtColor(cv2.merge((h, s, v)), cv2.COLOR_HSV2RGB)
     
     def _combined_basic(self, image: np.ndarray) -> np.ndarray:
-        """Комбинированная базовая аугментация"""
-        image = self._brightness_basic(image)
-        image = self._contrast_basic(image)
-        return image
+        """Комбинированная базовая аугментация: яркость, затем контраст
+        
+        Обе операции линейны, поэтому сводятся к одной таблице и одному проходу
+        по изображению. Центр контраста - среднее после изменения яркости,
+        оцененное как brightness * mean без учета насыщения на 255.
+        """
+        brightness = self._rng().uniform(0.8, 1.2)
+        contrast = self._rng().uniform(0.8, 1.2)
+        pivot = brightness * image_mean(image)
+        return cv2.LUT(image, linear_lut(brightness * contrast, pivot * (1 - contrast)))
     
     def ensure_directories(self):
         """Создание необходимых директорий"""
@@ -199,17 +250,63 @@ class AdvancedDataAugmentator:
         self.state['last_update'] = datetime.now().isoformat()
         self.state['config'] = self.config.__dict__
         
-        with open(self.state_file, 'w', encoding='utf-8') as f:
-            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        # Пишем во временный файл и атомарно подменяем: прерванная запись
+        # не испортит состояние. Без отступов файл в разы меньше и пишется быстрее
+        tmp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, self.state_file)
+    
+    def _list_dir_cached(self, directory: Path) -> set:
+        """Имена файлов в папке; папка читается одним os.scandir и кэшируется"""
+        listing = self._listing_cache.get(directory)
+        if listing is None:
+            try:
+                with os.scandir(directory) as it:
+                    listing = {entry.name for entry in it}
+            except FileNotFoundError:
+                listing = set()
+            # При параллельной обработке папку мог уже прочитать другой поток
+            listing = self._listing_cache.setdefault(directory, listing)
+        return listing
+    
+    def _path_exists(self, path: Path) -> bool:
+        """Проверка существования файла по листингу его папки вместо stat на каждый файл"""
+        return path.name in self._list_dir_cached(path.parent)
     
     def get_file_hash(self, filepath: Path) -> str:
         """Получение хеша файла для проверки изменений"""
         try:
+            md5 = hashlib.md5()
             with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    md5.update(chunk)
+            return md5.hexdigest()
         except Exception:
             return ""
     
+    def is_file_unchanged(self, filepath: Path, file_info: Dict[str, Any]) -> bool:
+        """Проверка, что файл не изменился с момента записи в состояние
+        
+        Если mtime и размер совпадают с сохраненными, файл не читается;
+        хеш считается только когда они отличаются.
+        """
+        try:
+            st = filepath.stat()
+        except OSError:
+            return False
+        
+        if file_info.get('mtime_ns') == st.st_mtime_ns and file_info.get('size') == st.st_size:
+            return True
+        
+        if file_info.get('hash') != self.get_file_hash(filepath):
+            return False
+        
+        # Содержимое прежнее (файл перезаписан или скопирован) - обновляем mtime и размер
+        file_info['mtime_ns'] = st.st_mtime_ns
+        file_info['size'] = st.st_size
+        return True
+    
     def parse_card_info(self, filename: str) -> Optional[Dict[str, str]]:
         """Парсинг информации о карте из имени файла"""
         name = Path(filename).stem
@@ -253,8 +350,6 @@ class AdvancedDataAugmentator:
     
     def apply_augmentation(self, image: np.ndarray, aug_type: str) -> np.ndarray:
         """Применение аугментации к изображению"""
-        np.random.seed(None)  # Сброс seed для случайности
-        
         if ALBUMENTATIONS_AVAILABLE and self.config.use_albumentations:
             if aug_type in self.augmentations:
                 transform = self.augmentations[aug_type]
@@ -266,18 +361,24 @@ class AdvancedDataAugmentator:
         
         return image
     
-    def is_file_processed(self, original_path: Path, aug_type: str, aug_idx: int) -> bool:
-        """Проверка, был ли файл уже обработан"""
+    def is_file_processed(self, original_path: Path, aug_type: str, aug_idx: int,
+                          unchanged: Optional[bool] = None) -> bool:
+        """Проверка, был ли файл уже обработан
+        
+        unchanged - уже вычисленный результат is_file_unchanged для оригинала,
+        чтобы не проверять файл заново для каждой аугментации.
+        """
         file_key = str(original_path)
         
         if file_key not in self.state['processed_files']:
             return False
         
         file_info = self.state['processed_files'][file_key]
-        current_hash = self.get_file_hash(original_path)
         
         # Проверяем, изменился ли файл
-        if file_info.get('hash') != current_hash:
+        if unchanged is None:
+            unchanged = self.is_file_unchanged(original_path, file_info)
+        if not unchanged:
             return False
         
         # Проверяем, есть ли эта аугментация
@@ -289,9 +390,14 @@ class AdvancedDataAugmentator:
         """Отметка файла как обработанного"""
         file_key = str(original_path)
         
-        if file_key not in self.state['processed_files']:
+        file_info = self.state['processed_files'].get(file_key)
+        # Для нового или измененного оригинала прежние аугментации недействительны
+        if file_info is None or not self.is_file_unchanged(original_path, file_info):
+            st = original_path.stat()
             self.state['processed_files'][file_key] = {
                 'hash': self.get_file_hash(original_path),
+                'mtime_ns': st.st_mtime_ns,
+                'size': st.st_size,
                 'augmentations': {}
             }
         
@@ -301,6 +407,130 @@ class AdvancedDataAugmentator:
             'created_at': datetime.now().isoformat()
         }
     
+    def _augment_row(self, row, mode: str) -> Tuple[List[Dict[str, str]], int, int]:
+        """Аугментация одного оригинала: (записи реестра, создано, пропущено)
+        
+        row - строка датасета из df.itertuples(index=False)
+        """
+        records = []
+        processed_count = 0
+        skipped_count = 0
+        
+        try:
+            # Определение пути к оригинальному файлу
+            filepath = getattr(row, 'filepath', None)
+            if isinstance(filepath, str) and filepath:
+                original_path = self.cards_dir / filepath
+            else:
+                original_path = self.cards_dir / row.filename
+            
+            if not self._path_exists(original_path):
+                self.logger.warning(f"Файл не найден: {original_path}")
+                return records, processed_count, skipped_count
+            
+            # Информация о карте: load_dataset уже разобрал имя по тем же правилам,
+            # что и parse_card_info, поэтому повторно парсим только без этих столбцов
+            set_name = getattr(row, 'set_name', None)
+            if isinstance(set_name, str):
+                card_info = {
+                    'set_name': set_name,
+                    'card_number': str(row.card_number),
+                    'variant': row.variant
+                }
+            else:
+                card_info = self.parse_card_info(row.filename)
+            if not card_info:
+                self.logger.warning(f"Не удалось распарсить: {row.filename}")
+                return records, processed_count, skipped_count
+            
+            # Загрузка изображения
+            image = cv2.imread(str(original_path))
+            if image is None:
+                self.logger.warning(f"Не удалось загрузить: {original_path}")
+                return records, processed_count, skipped_count
+            
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            
+            # Изменился ли оригинал с прошлого запуска - проверяем один раз на строку
+            file_info = self.state['processed_files'].get(str(original_path))
+            unchanged = file_info is not None and self.is_file_unchanged(original_path, file_info)
+            
+            # Сохранение оригинала
+            original_output_path = self.get_augmented_structure_path(
+                card_info, row.filename
+            )
+            original_output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # Неизмененный оригинал повторно не кодируем: копия в WEBP была бы той же
+            if not (unchanged and self._path_exists(original_output_path)):
+                pil_image = Image.fromarray(image)
+                pil_image.save(original_output_path, 'WEBP', quality=self.config.image_quality,
+                               method=self.config.webp_method)
+                self._list_dir_cached(original_output_path.parent).add(original_output_path.name)
+                saved_original = True
+            else:
+                saved_original = False
+            
+            if mode == 'full' or saved_original:
+                records.append({
+                    'filename': original_output_path.name,
+                    'filepath': str(original_output_path.relative_to(self.augmented_dir)),
+                    'original_filename': row.filename,
+                    'augmentation_type': 'original',
+                    'set_name': card_info['set_name'],
+                    'card_number': card_info['card_number'],
+                    'variant': card_info['variant'],
+                    'full_path': str(original_output_path)
+                })
+            
+            # Папка и части имени общие для всех аугментаций оригинала: считаем
+            # их один раз (как в get_augmented_structure_path), папка уже создана выше
+            variant_dir = original_output_path.parent
+            aug_base_name = Path(row.filename).stem
+            aug_ext = Path(row.filename).suffix or '.webp'
+            
+            # Создание аугментированных версий
+            for aug_idx in range(self.config.num_augmentations):
+                aug_type = self.config.augmentation_types[aug_idx % len(self.config.augmentation_types)]
+                
+                # Проверка идемпотентности
+                if mode == 'incremental' and self.is_file_processed(original_path, aug_type, aug_idx, unchanged):
+                    skipped_count += 1
+                    continue
+                
+                # Применение аугментации
+                # Все преобразования возвращают новый массив и не меняют вход,
+                # поэтому исходник не копируем перед каждой аугментацией
+                augmented_image = self.apply_augmentation(image, aug_type)
+                
+                # Сохранение аугментированного изображения
+                aug_output_path = variant_dir / f"{aug_base_name}_aug_{aug_idx + 1}{aug_ext}"
+                
+                pil_image = Image.fromarray(augmented_image)
+                pil_image.save(aug_output_path, 'WEBP', quality=self.config.image_quality,
+                               method=self.config.webp_method)
+                
+                # Запись в реестр
+                records.append({
+                    'filename': aug_output_path.name,
+                    'filepath': str(aug_output_path.relative_to(self.augmented_dir)),
+                    'original_filename': row.filename,
+                    'augmentation_type': aug_type,
+                    'set_name': card_info['set_name'],
+                    'card_number': card_info['card_number'],
+                    'variant': card_info['variant'],
+                    'full_path': str(aug_output_path)
+                })
+                
+                # Отметка как обработанного
+                self.mark_file_processed(original_path, aug_type, aug_idx, aug_output_path)
+                processed_count += 1
+            
+        except Exception as e:
+            self.logger.error(f"Ошибка при обработке {row.filename}: {e}")
+        
+        return records, processed_count, skipped_count
+    
     def create_augmented_dataset(self, mode: str = 'full') -> pd.DataFrame:
         """Создание аугментированного датасета"""
         self.logger.info(f"=== СОЗДАНИЕ АУГМЕНТИРОВАННОГО ДАТАСЕТА (режим: {mode}) ===")
@@ -318,93 +548,28 @@ class AdvancedDataAugmentator:
         
         self.logger.info(f"Обработка {len(df)} изображений...")
         
-        for idx, row in tqdm(df.iterrows(), total=len(df), desc="Аугментация"):
-            try:
-                # Определение пути к оригинальному файлу
-                if 'filepath' in row and row['filepath']:
-                    original_path = self.cards_dir / row['filepath']
-                else:
-                    original_path = self.cards_dir / row['filename']
-                
-                if not original_path.exists():
-                    self.logger.warning(f"Файл не найден: {original_path}")
-                    continue
-                
-                # Парсинг информации о карте
-                card_info = self.parse_card_info(row['filename'])
-                if not card_info:
-                    self.logger.warning(f"Не удалось распарсить: {row['filename']}")
-                    continue
-                
-                # Загрузка изображения
-                image = cv2.imread(str(original_path))
-                if image is None:
-                    self.logger.warning(f"Не удалось загрузить: {original_path}")
-                    continue
-                
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                
-                # Сохранение оригинала
-                original_output_path = self.get_augmented_structure_path(
-                    card_info, row['filename']
-                )
-                original_output_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                if not original_output_path.exists() or mode == 'full':
-                    pil_image = Image.fromarray(image)
-                    pil_image.save(original_output_path, 'WEBP', quality=self.config.image_quality)
-                    
-                    augmented_records.append({
-                        'filename': original_output_path.name,
-                        'filepath': str(original_output_path.relative_to(self.augmented_dir)),
-                        'original_filename': row['filename'],
-                        'augmentation_type': 'original',
-                        'set_name': card_info['set_name'],
-                        'card_number': card_info['card_number'],
-                        'variant': card_info['variant'],
-                        'full_path': str(original_output_path)
-                    })
-                
-                # Создание аугментированных версий
-                for aug_idx in range(self.config.num_augmentations):
-                    aug_type = self.config.augmentation_types[aug_idx % len(self.config.augmentation_types)]
-                    
-                    # Проверка идемпотентности
-                    if mode == 'incremental' and self.is_file_processed(original_path, aug_type, aug_idx):
-                        skipped_count += 1
-                        continue
-                    
-                    # Применение аугментации
-                    augmented_image = self.apply_augmentation(image.copy(), aug_type)
-                    
-                    # Сохранение аугментированного изображения
-                    aug_output_path = self.get_augmented_structure_path(
-                        card_info, row['filename'], aug_type, aug_idx
-                    )
-                    aug_output_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    pil_image = Image.fromarray(augmented_image)
-                    pil_image.save(aug_output_path, 'WEBP', quality=self.config.image_quality)
-                    
-                    # Запись в реестр
-                    augmented_records.append({
-                        'filename': aug_output_path.name,
-                        'filepath': str(aug_output_path.relative_to(self.augmented_dir)),
-                        'original_filename': row['filename'],
-                        'augmentation_type': aug_type,
-                        'set_name': card_info['set_name'],
-                        'card_number': card_info['card_number'],
-                        'variant': card_info['variant'],
-                        'full_path': str(aug_output_path)
-                    })
-                    
-                    # Отметка как обработанного
-                    self.mark_file_processed(original_path, aug_type, aug_idx, aug_output_path)
-                    processed_count += 1
-                
-            except Exception as e:
-                self.logger.error(f"Ошибка при обработке {row['filename']}: {e}")
-                continue
+        # Листинги с прошлого запуска могли устареть
+        self._listing_cache.clear()
+        
+        # Кодеки WEBP и операции OpenCV отпускают GIL, поэтому оригиналы
+        # обрабатываются в пуле потоков. map сохраняет порядок записей
+        workers = self.config.num_workers or os.cpu_count() or 1
+        # itertuples отдает легкие namedtuple вместо Series на каждую строку
+        rows = df.itertuples(index=False)
+        # Параллелизм уже на уровне изображений: собственный пул потоков OpenCV
+        # внутри каждой задачи только конкурировал бы с ними за ядра
+        cv2_threads = cv2.getNumThreads()
+        if workers > 1:
+            cv2.setNumThreads(1)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(self._augment_row, rows, repeat(mode))
+                for records, processed, skipped in tqdm(results, total=len(df), desc="Аугментация"):
+                    augmented_records.extend(records)
+                    processed_count += processed
+                    skipped_count += skipped
+        finally:
+            cv2.setNumThreads(cv2_threads)
         
         # Сохранение состояния
         self.save_state()
@@ -425,6 +590,18 @@ class AdvancedDataAugmentator:
         # Загрузка существующего CSV если есть
         if self.csv_file.exists():
             try:
+                # Сначала читаем только заголовок и пути: если новые строки ничего
+                # не заменяют, их достаточно дописать в конец без перезаписи файла
+                columns = pd.read_csv(self.csv_file, encoding='utf-8', nrows=0).columns
+                if list(columns) == list(aug_df.columns):
+                    existing_paths = pd.read_csv(self.csv_file, encoding='utf-8',
+                                                 usecols=['filepath'])['filepath']
+                    if not aug_df['filepath'].isin(existing_paths).any():
+                        aug_df.to_csv(self.csv_file, mode='a', header=False,
+                                      index=False, encoding='utf-8')
+                        self.logger.info(f"Датасет дополнен: {self.csv_file}")
+                        return
+                
                 existing_df = pd.read_csv(self.csv_file, encoding='utf-8')
                 # Объединение с новыми данными (удаление дубликатов)
                 combined_df = pd.concat([existing_df, aug_df], ignore_index=True)
@@ -453,6 +630,15 @@ class AdvancedDataAugmentator:
         self.logger.info(f"Энкодеры сохранены в: {self.encoders_file}")
         return aug_df
     
+    @staticmethod
+    def _remove_file(filepath: Path) -> Optional[OSError]:
+        """Удаляет файл; возвращает ошибку вместо исключения"""
+        try:
+            filepath.unlink(missing_ok=True)
+            return None
+        except OSError as e:
+            return e
+    
     def cleanup_orphaned_files(self) -> int:
         """Удаление аугментированных файлов без оригиналов"""
         self.logger.info("Поиск и удаление устаревших аугментаций...")
@@ -462,41 +648,56 @@ class AdvancedDataAugmentator:
         # Загрузка списка оригинальных файлов
         dataset = BerserkCardDataset(str(self.cards_dir))
         df = dataset.load_dataset()
-        original_files = set()
         
-        for _, row in df.iterrows():
-            if 'filepath' in row and row['filepath']:
-                original_files.add(row['filepath'])
-            else:
-                original_files.add(row['filename'])
+        # Берем столбцы целиком вместо iterrows, который создает Series на каждую строку
+        filenames = df['filename'].to_numpy(dtype=object) if not df.empty else np.array([], dtype=object)
+        if 'filepath' in df.columns:
+            filepaths = df['filepath'].fillna('').to_numpy(dtype=object)
+            original_files = set(np.where(filepaths != '', filepaths, filenames))
+        else:
+            original_files = set(filenames)
+        
+        # Сопоставляем по имени без расширения: множество дает поиск за O(1)
+        # вместо перебора всех оригиналов для каждого файла
+        original_stems = {Path(orig_file).stem for orig_file in original_files}
         
         # Проход по аугментированным файлам
+        orphaned_files = []
         for aug_file in self.augmented_dir.rglob('*'):
-            if aug_file.is_file() and aug_file.suffix.lower() in ['.webp', '.jpg', '.jpeg', '.png']:
-                # Проверка, есть ли оригинал
-                relative_path = aug_file.relative_to(self.augmented_dir)
-                
+            if aug_file.suffix.lower() in IMAGE_EXTENSIONS and aug_file.is_file():
                 # Если это аугментированный файл (содержит _aug_)
                 if '_aug_' in aug_file.stem:
                     # Извлекаем базовое имя
-                    base_name = '_'.join(aug_file.stem.split('_')[:-2]) + aug_file.suffix
-                    
-                    # Ищем оригинал
-                    original_found = False
-                    for orig_file in original_files:
-                        if Path(orig_file).stem == Path(base_name).stem:
-                            original_found = True
-                            break
+                    base_stem = '_'.join(aug_file.stem.split('_')[:-2])
                     
-                    if not original_found:
-                        aug_file.unlink()
-                        removed_count += 1
-                        self.logger.info(f"Удален устаревший файл: {relative_path}")
-        
-        # Удаление пустых директорий
-        for dir_path in self.augmented_dir.rglob('*'):
-            if dir_path.is_dir() and not any(dir_path.iterdir()):
-                dir_path.rmdir()
+                    if base_stem not in original_stems:
+                        orphaned_files.append(aug_file)
+        
+        # Удаления - независимые системные вызовы без GIL, выполняем их параллельно
+        emptied_dirs = set()
+        if orphaned_files:
+            workers = min(32, len(orphaned_files))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                errors = list(executor.map(self._remove_file, orphaned_files))
+            
+            for aug_file, error in zip(orphaned_files, errors):
+                relative_path = aug_file.relative_to(self.augmented_dir)
+                if error is None:
+                    removed_count += 1
+                    emptied_dirs.add(aug_file.parent)
+                    self.logger.info(f"Удален устаревший файл: {relative_path}")
+                else:
+                    self.logger.warning(f"Не удалось удалить {relative_path}: {error}")
+        
+        # Удаление опустевших директорий: пустыми могли стать только папки
+        # удаленных файлов и их родители, повторно обходить все дерево не нужно
+        for dir_path in sorted(emptied_dirs, key=lambda d: len(d.parts), reverse=True):
+            while dir_path != self.augmented_dir and self.augmented_dir in dir_path.parents:
+                try:
+                    dir_path.rmdir()
+                except OSError:
+                    break  # Папка не пуста
+                dir_path = dir_path.parent
         
         self.logger.info(f"Удалено устаревших файлов: {removed_count}")
         return removed_count
@@ -507,15 +708,21 @@ class AdvancedDataAugmentator:
             return {}
         
         try:
-            df = pd.read_csv(self.csv_file, encoding='utf-8')
+            # Для статистики нужны три столбца; category хранит каждое значение один раз
+            stat_columns = ['augmentation_type', 'set_name', 'variant']
+            df = pd.read_csv(self.csv_file, encoding='utf-8', usecols=stat_columns,
+                             dtype={col: 'category' for col in stat_columns})
+            
+            aug_counts = df['augmentation_type'].value_counts().to_dict()
+            original_files = aug_counts.get('original', 0)
             
             stats = {
                 'total_files': len(df),
-                'original_files': len(df[df['augmentation_type'] == 'original']),
-                'augmented_files': len(df[df['augmentation_type'] != 'original']),
+                'original_files': original_files,
+                'augmented_files': len(df) - original_files,
                 'sets': df['set_name'].nunique(),
                 'variants': df['variant'].nunique(),
-                'augmentation_types': df['augmentation_type'].value_counts().to_dict()
+                'augmentation_types': aug_counts
             }
             
             return stats
@@ -541,10 +748,12 @@ def create_default_config(config_path: str):
     config_data = {
         'num_augmentations': config.num_augmentations,
         'image_quality': config.image_quality,
+        'webp_method': config.webp_method,
         'target_size': config.target_size,
         'augmentation_types': config.augmentation_types,
         'use_albumentations': config.use_albumentations,
-        'seed': config.seed
+        'seed': config.seed,
+        'num_workers': config.num_workers
     }
     
     with open(config_path, 'w', encoding='utf-8') as f:
@@ -582,6 +791,8 @@ def main():
                        help='Не использовать библиотеку albumentations')
     parser.add_argument('--seed', type=int, default=42,
                        help='Seed для воспроизводимости')
+    parser.add_argument('--workers', type=int, default=0,
+                       help='Количество потоков обработки (0 - по числу ядер)')
     
     args = parser.parse_args()
     
@@ -597,7 +808,8 @@ def main():
         config = AugmentationConfig(
             num_augmentations=args.num_augmentations,
             use_albumentations=not args.no_albumentations,
-            seed=args.seed
+            seed=args.seed,
+            num_workers=args.workers
         )
     
     # Установка seed
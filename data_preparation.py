@@ -6,6 +6,14 @@ import numpy as np
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+# Допустимые расширения изображений карт
+IMAGE_EXTENSIONS = frozenset({'.webp', '.jpg', '.jpeg', '.png'})
+
+# С какого размера датасета изображения декодируются в пуле потоков
+PARALLEL_LOAD_MIN_IMAGES = 256
 
 class BerserkCardDataset:
     def __init__(self, cards_dir='./cards'):
@@ -16,6 +24,8 @@ class BerserkCardDataset:
             'card_number': LabelEncoder(),
             'variant': LabelEncoder()
         }
+        # Прошла ли последняя create_dataset_arrays по всем строкам датасета
+        self.last_load_complete = False
         
     def parse_filename(self, filename):
         """Парсит название файла карты и извлекает информацию"""
@@ -46,32 +56,48 @@ class BerserkCardDataset:
             'full_name': name
         }
     
+    def _list_images(self, path):
+        """Возвращает имена файлов изображений в папке"""
+        with os.scandir(path) as it:
+            return [entry.name for entry in it
+                    if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS]
+    
     def load_dataset(self):
         """Загружает и парсит все файлы карт"""
         print("Загрузка датасета...")
         
-        # Проверяем структуру папки
-        subdirs = [d for d in os.listdir(self.cards_dir) 
-                   if os.path.isdir(os.path.join(self.cards_dir, d))]
+        # Один проход по корню: DirEntry кэширует тип записи, лишних stat не нужно
+        with os.scandir(self.cards_dir) as it:
+            entries = list(it)
+        subdirs = [e for e in entries if e.is_dir()]
         
         if len(subdirs) > 0:
             # Структура с подпапками - загружаем из подпапок
             print("Найдена структура с подпапками, загружаем из подпапок...")
-            for subdir in subdirs:
-                subdir_path = os.path.join(self.cards_dir, subdir)
-                for filename in os.listdir(subdir_path):
-                    if filename.lower().endswith(('.webp', '.jpg', '.jpeg', '.png')):
-                        card_info = self.parse_filename(filename)
-                        if card_info:
-                            # Добавляем путь к подпапке
-                            card_info['filepath'] = os.path.join(subdir, filename)
-                            card_info['class_from_folder'] = subdir
-                            self.data.append(card_info)
+            paths = [subdir.path for subdir in subdirs]
+            # Чтение папок упирается в системные вызовы, поэтому при большом
+            # числе подпапок читаем их параллельно
+            if len(paths) >= 8:
+                workers = min(32, (os.cpu_count() or 1) * 4)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    listings = list(executor.map(self._list_images, paths))
+            else:
+                listings = [self._list_images(path) for path in paths]
+            
+            for subdir, filenames in zip(subdirs, listings):
+                for filename in filenames:
+                    card_info = self.parse_filename(filename)
+                    if card_info:
+                        # Добавляем путь к подпапке
+                        card_info['filepath'] = os.path.join(subdir.name, filename)
+                        card_info['class_from_folder'] = subdir.name
+                        self.data.append(card_info)
         else:
             # Изображения в корне папки
             print("Загружаем изображения из корня папки...")
-            for filename in os.listdir(self.cards_dir):
-                if filename.lower().endswith(('.webp', '.jpg', '.jpeg', '.png')):
+            for entry in entries:
+                filename = entry.name
+                if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
                     card_info = self.parse_filename(filename)
                     if card_info:
                         card_info['filepath'] = filename
@@ -99,14 +125,11 @@ class BerserkCardDataset:
         
         return df
     
-    def load_and_preprocess_image(self, image_path, target_size=(224, 224)):
-        """Загружает и предобрабатывает изображение"""
+    @staticmethod
+    def _load_image_uint8(image_path, target_size=(224, 224)):
+        """Загружает изображение и приводит к target_size, возвращает uint8 или None"""
         try:
-            # Проверяем существование файла
-            if not os.path.exists(image_path):
-                print(f"Файл не найден: {image_path}")
-                return None
-                
+            # Отсутствие файла узнаем из самого открытия, без отдельного stat
             image = Image.open(image_path)
             
             # Конвертируем в RGB если нужно
@@ -116,13 +139,15 @@ class BerserkCardDataset:
             # Изменяем размер с использованием LANCZOS для лучшего качества
             image = image.resize(target_size, Image.Resampling.LANCZOS)
             
-            # Конвертируем в numpy array и нормализуем
-            image_array = np.array(image, dtype=np.float32) / 255.0
+            image_array = np.array(image, dtype=np.uint8)
             
             # Освобождаем память
             image.close()
             
             return image_array
+        except FileNotFoundError:
+            print(f"Файл не найден: {image_path}")
+            return None
         except (OSError, IOError) as e:
             print(f"Ошибка при загрузке изображения {image_path}: {e}")
             return None
@@ -130,6 +155,41 @@ class BerserkCardDataset:
             print(f"Неожиданная ошибка при обработке {image_path}: {e}")
             return None
     
+    @staticmethod
+    def load_and_preprocess_image(image_path, target_size=(224, 224)):
+        """Загружает и предобрабатывает изображение"""
+        image_array = BerserkCardDataset._load_image_uint8(image_path, target_size)
+        if image_array is None:
+            return None
+        
+        # Конвертируем в float и нормализуем
+        return image_array.astype(np.float32) / 255.0
+    
+    def _iter_images(self, image_paths, target_size):
+        """Отдает изображения uint8 в порядке image_paths (None для незагруженных)
+        
+        Декодирование PIL и ресайз LANCZOS отпускают GIL, поэтому на больших
+        датасетах файлы загружаются в пуле потоков. На маленьких запуск пула
+        обходится дороже самой загрузки. Если пул отказал, оставшиеся файлы
+        дочитываются последовательно.
+        """
+        loaded = 0
+        if len(image_paths) >= PARALLEL_LOAD_MIN_IMAGES and (os.cpu_count() or 1) > 1:
+            executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+            try:
+                for image in executor.map(self._load_image_uint8, image_paths, repeat(target_size)):
+                    yield image
+                    loaded += 1
+                return
+            except Exception as e:
+                print(f"Ошибка параллельной загрузки: {e}")
+                print(f"Продолжаем последовательно с изображения {loaded + 1}/{len(image_paths)}")
+            finally:
+                executor.shutdown(cancel_futures=True)
+        
+        for image_path in image_paths[loaded:]:
+            yield self._load_image_uint8(image_path, target_size)
+    
     def create_dataset_arrays(self, df, target_size=(224, 224)):
         """Создает массивы изображений и меток"""
         images = []
@@ -139,19 +199,31 @@ class BerserkCardDataset:
         print("Загрузка изображений...")
         total_images = len(df)
         
-        for idx, row in df.iterrows():
-            try:
-                # Используем filepath если есть, иначе filename
-                if 'filepath' in row and row['filepath']:
-                    image_path = os.path.join(self.cards_dir, row['filepath'])
-                else:
-                    image_path = os.path.join(self.cards_dir, row['filename'])
-                    
-                image = self.load_and_preprocess_image(image_path, target_size)
-                
+        # Забираем колонки один раз: iterrows создает Series на каждую строку
+        filenames = df['filename'].to_numpy(dtype=object)
+        if 'filepath' in df.columns:
+            filepaths = df['filepath'].to_numpy(dtype=object)
+        else:
+            filepaths = [None] * total_images
+        card_ids = df['card_id_encoded'].to_numpy()
+        
+        # Используем filepath если есть, иначе filename
+        image_paths = [
+            os.path.join(self.cards_dir, filepath if isinstance(filepath, str) and filepath else filename)
+            for filepath, filename in zip(filepaths, filenames)
+        ]
+        
+        # Изображения приходят как uint8 - вчетверо меньше float32, нормализуем в конце
+        results = self._iter_images(image_paths, target_size)
+        
+        self.last_load_complete = False
+        idx = 0
+        try:
+            # Результаты приходят в порядке image_paths, метки остаются сопоставлены
+            for idx, (image_path, card_id, image) in enumerate(zip(image_paths, card_ids, results)):
                 if image is not None:
                     images.append(image)
-                    labels.append(row['card_id_encoded'])
+                    labels.append(card_id)
                 else:
                     failed_images.append(image_path)
                 
@@ -163,15 +235,18 @@ class BerserkCardDataset:
                 if (idx + 1) % 1000 == 0:
                     success_rate = (len(images) / (idx + 1)) * 100
                     print(f"Успешно загружено: {len(images)}, Ошибок: {len(failed_images)}, Успешность: {success_rate:.1f}%")
+            
+            self.last_load_complete = True
                     
-            except KeyboardInterrupt:
-                print(f"\nПрервано пользователем на изображении {idx + 1}/{total_images}")
-                print(f"Загружено изображений: {len(images)}")
-                break
-            except Exception as e:
-                print(f"Критическая ошибка при обработке изображения {idx + 1}: {e}")
-                failed_images.append(f"Index {idx}: {e}")
-                continue
+        except KeyboardInterrupt:
+            print(f"\nПрервано пользователем на изображении {idx + 1}/{total_images}")
+            print(f"Загружено изображений: {len(images)}")
+        except Exception as e:
+            print(f"Критическая ошибка при обработке изображения {idx + 1}: {e}")
+            failed_images.append(f"Index {idx}: {e}")
+        finally:
+            # Останавливаем пул загрузки, если цикл прервался раньше конца
+            results.close()
         
         print(f"\nЗагрузка завершена:")
         print(f"Успешно загружено: {len(images)} изображений")
@@ -183,7 +258,9 @@ class BerserkCardDataset:
         if len(images) == 0:
             raise ValueError("Не удалось загрузить ни одного изображения!")
         
-        return np.array(images, dtype=np.float32), np.array(labels)
+        X = np.array(images, dtype=np.float32)
+        X /= 255.0
+        return X, np.array(labels, dtype=np.int32)
     
     def save_label_encoders(self, filepath='label_encoders.json'):
         """Сохраняет энкодеры меток"""
@@ -203,7 +280,7 @@ class BerserkCardDataset:
         print("\n=== ИНФОРМАЦИЯ О ДАТАСЕТЕ ===")
         print(f"Общее количество карт: {len(df)}")
         print(f"\nКоличество карт по сетам:")
-        print(df['set_name'].value_counts().sort_index())
+        print(df['set_name'].value_counts(sort=False).sort_index())
         print(f"\nВарианты карт:")
         print(df['variant'].value_counts())
         print(f"\nУникальных карт: {df['card_id'].nunique()}")
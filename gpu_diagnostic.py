@@ -9,6 +9,11 @@ import sys
 import platform
 import subprocess
 import os
+import importlib.util
+
+def is_tensorflow_installed():
+    """Проверяет наличие TensorFlow без его импорта"""
+    return importlib.util.find_spec('tensorflow') is not None
 
 def check_nvidia_driver():
     """Проверяет наличие и версию драйвера NVIDIA"""
@@ -72,6 +77,10 @@ def check_cudnn():
     """Проверяет установку cuDNN"""
     print("\n🔍 Проверка cuDNN...")
     
+    if not is_tensorflow_installed():
+        print("❌ TensorFlow не установлен")
+        return False
+    
     try:
         import tensorflow as tf
         
@@ -101,6 +110,10 @@ def check_tensorflow_gpu_support():
     """Детальная проверка поддержки GPU в TensorFlow"""
     print("\n🔍 Детальная проверка TensorFlow GPU...")
     
+    if not is_tensorflow_installed():
+        print("❌ TensorFlow не установлен")
+        return False
+    
     try:
         import tensorflow as tf
         print(f"✅ TensorFlow версия: {tf.__version__}")
@@ -118,28 +118,36 @@ def check_cards_directory():
         print("Создайте папку 'cards' и поместите в неё изображения карт")
         return False
     
-    # Подсчитываем количество файлов в корне и подпапках
-    card_files_root = list(cards_path.glob("*.webp"))
-    card_files_subdirs = list(cards_path.glob("**/*.webp"))
-    # Убираем дубликаты (файлы из корня могут попасть в оба списка)
-    all_files = list(cards_path.glob("*.webp")) + list(cards_path.glob("**/*.webp"))
-    unique_files = list(set(all_files))
-    total_files = len(unique_files)
+    # Подсчитываем файлы в корне и подпапках за один проход os.scandir,
+    # не создавая объект Path на каждый файл. Расширение сравниваем без учета
+    # регистра, как и прежний glob на Windows (.WEBP тоже считается)
+    root_count = 0
+    subdirs_count = 0
+    pending = [str(cards_path)]
+    while pending:
+        current = pending.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() == '.webp':
+                    if current == str(cards_path):
+                        root_count += 1
+                    else:
+                        subdirs_count += 1
+    total_files = root_count + subdirs_count
     
     if total_files == 0:
         print("❌ В папке 'cards' нет файлов .webp")
         print("Поместите изображения карт в формате WebP в папку 'cards' или её подпапки")
         return False
     
-    # Подсчитываем файлы только в подпапках (исключая корень)
-    subdirs_only = [f for f in card_files_subdirs if f.parent != cards_path]
-    
-    if card_files_root and subdirs_only:
-        print(f"✅ Найдено {total_files} изображений карт ({len(card_files_root)} в корне, {len(subdirs_only)} в подпапках)")
-    elif card_files_root and not subdirs_only:
-        print(f"✅ Найдено {len(card_files_root)} изображений карт в корне папки")
+    if root_count and subdirs_count:
+        print(f"✅ Найдено {total_files} изображений карт ({root_count} в корне, {subdirs_count} в подпапках)")
+    elif root_count and not subdirs_count:
+        print(f"✅ Найдено {root_count} изображений карт в корне папки")
     else:
-        print(f"✅ Найдено {len(subdirs_only)} изображений карт в подпапках")
+        print(f"✅ Найдено {subdirs_count} изображений карт в подпапках")
     
     return True
 
@@ -4,7 +4,7 @@ import json
 from PIL import Image
 import os
 import random
-from data_preparation import BerserkCardDataset
+from data_preparation import BerserkCardDataset, IMAGE_EXTENSIONS
 import matplotlib.pyplot as plt
 
 class BerserkCardPredictor:
@@ -148,20 +148,24 @@ class BerserkCardPredictor:
         image_files = []
         image_paths = []
         
-        # Проверяем изображения в корне папки
-        for f in os.listdir(cards_dir):
-            if f.lower().endswith(('.webp', '.jpg', '.jpeg', '.png')):
-                image_files.append(f)
-                image_paths.append(os.path.join(cards_dir, f))
+        # Один проход os.scandir по корню: DirEntry знает тип записи без отдельного stat
+        subdirs = []
+        with os.scandir(cards_dir) as it:
+            for entry in it:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                # Проверяем изображения в корне папки
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                    image_files.append(entry.name)
+                    image_paths.append(entry.path)
         
         # Проверяем изображения в подпапках
-        for subdir in os.listdir(cards_dir):
-            subdir_path = os.path.join(cards_dir, subdir)
-            if os.path.isdir(subdir_path):
-                for f in os.listdir(subdir_path):
-                    if f.lower().endswith(('.webp', '.jpg', '.jpeg', '.png')):
-                        image_files.append(f)
-                        image_paths.append(os.path.join(subdir_path, f))
+        for subdir_path in subdirs:
+            with os.scandir(subdir_path) as it:
+                for entry in it:
+                    if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                        image_files.append(entry.name)
+                        image_paths.append(entry.path)
         
         if not image_files:
             print("Изображения не найдены!")
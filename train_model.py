@@ -1,8 +1,7 @@
 # Исправление кодировки для корректного вывода эмодзи в Windows
 import sys
-if sys.platform == 'win32':
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+if sys.platform == 'win32' and sys.stdout.encoding.lower() not in ('utf-8', 'utf8'):
+    sys.stdout.reconfigure(encoding='utf-8')
 
 import tensorflow as tf
 import numpy as np
@@ -12,6 +11,7 @@ from sklearn.metrics import classification_report, confusion_matrix
 import matplotlib.pyplot as plt
 import json
 import os
+import hashlib
 from pathlib import Path
 from data_preparation import BerserkCardDataset
 from tqdm import tqdm
@@ -185,6 +185,82 @@ class BerserkCardClassifier:
         
         print(f"Информация о модели сохранена: {filepath}")
 
+# Отпечаток изображений, из которых построены X_data.npy и y_data.npy
+ARRAYS_FINGERPRINT_FILE = 'X_data.fingerprint'
+
+def dataset_fingerprint(df, cards_dir):
+    """Считает отпечаток датасета по (путь, размер, mtime, метка) каждого изображения
+    
+    stat на файл в разы дешевле декодирования, поэтому по отпечатку можно понять,
+    актуальны ли сохраненные массивы, не открывая сами изображения.
+    """
+    digest = hashlib.sha1()
+    filenames = df['filename'].to_numpy(dtype=object)
+    if 'filepath' in df.columns:
+        filepaths = df['filepath'].to_numpy(dtype=object)
+    else:
+        filepaths = [None] * len(df)
+    
+    for filepath, filename, card_id in zip(filepaths, filenames, df['card_id_encoded'].to_numpy()):
+        # Путь строим так же, как create_dataset_arrays
+        if isinstance(filepath, str) and filepath:
+            image_path = os.path.join(cards_dir, filepath)
+        else:
+            image_path = os.path.join(cards_dir, filename)
+        try:
+            st = os.stat(image_path)
+            file_state = f"{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            file_state = 'missing'
+        digest.update(f"{image_path}\0{file_state}\0{card_id}\n".encode('utf-8'))
+    
+    return digest.hexdigest()
+
+def load_or_create_arrays(dataset, df):
+    """Загружает сохраненные массивы, если изображения не менялись, иначе создает заново"""
+    fingerprint = dataset_fingerprint(df, dataset.cards_dir)
+    saved_fingerprint = None
+    if os.path.exists(ARRAYS_FINGERPRINT_FILE):
+        with open(ARRAYS_FINGERPRINT_FILE, 'r', encoding='utf-8') as f:
+            saved_fingerprint = f.read().strip()
+    
+    arrays_exist = os.path.exists('X_data.npy') and os.path.exists('y_data.npy')
+    if arrays_exist and saved_fingerprint == fingerprint:
+        print("Загружаем сохраненные массивы данных...")
+        # mmap: в память попадают только строки, выбранные train_test_split
+        X = np.load('X_data.npy', mmap_mode='r')
+        # Массивы с отпечатком всегда сохранены create_dataset_arrays, метки уже int32
+        y = np.load('y_data.npy', allow_pickle=False)
+        print(f"Загружено {len(X)} изображений из сохраненных файлов")
+        return X, y
+    
+    if arrays_exist and saved_fingerprint is None:
+        # Массивы сохранены старой версией скрипта, их актуальность не проверить
+        print("Сохраненные массивы без отпечатка датасета, пересоздаем их...")
+    elif arrays_exist:
+        print("Изображения изменились после сохранения массивов, пересоздаем их...")
+    
+    # Загружаем изображения
+    print("Загружаем изображения...")
+    X, y = dataset.create_dataset_arrays(df, target_size=(224, 224))
+    
+    if not dataset.last_load_complete:
+        # Неполные массивы не сохраняем, иначе они считались бы актуальными
+        print("Загрузка изображений не завершена, массивы данных не сохраняются")
+        return X, y
+    
+    # Сохраняем массивы для будущего использования. Старый отпечаток удаляем
+    # заранее: если запись прервется, массивы не сочтутся актуальными
+    print("Сохраняем массивы данных...")
+    if os.path.exists(ARRAYS_FINGERPRINT_FILE):
+        os.remove(ARRAYS_FINGERPRINT_FILE)
+    np.save('X_data.npy', X)
+    np.save('y_data.npy', y)
+    with open(ARRAYS_FINGERPRINT_FILE, 'w', encoding='utf-8') as f:
+        f.write(fingerprint)
+    print("Массивы данных сохранены в X_data.npy и y_data.npy")
+    return X, y
+
 def main():
     print("=== ОБУЧЕНИЕ МОДЕЛИ РАСПОЗНАВАНИЯ КАРТ БЕРСЕРК ===")
     
@@ -230,28 +306,14 @@ def main():
         dataset.save_label_encoders('./cards_augmented/augmented_label_encoders.json')
         df.to_csv('./cards_augmented/augmented_dataset.csv', index=False, encoding='utf-8')
         
-        # Проверяем наличие готовых массивов данных
-        if os.path.exists('X_data.npy') and os.path.exists('y_data.npy'):
-            print("Загружаем сохраненные массивы данных...")
-            X = np.load('X_data.npy')
-            y = np.load('y_data.npy')
-            print(f"Загружено {len(X)} изображений из сохраненных файлов")
-        else:
-            # Загружаем изображения
-            print("Загружаем изображения...")
-            X, y = dataset.create_dataset_arrays(df, target_size=(224, 224))
-            
-            # Сохраняем массивы для будущего использования
-            print("Сохраняем массивы данных...")
-            np.save('X_data.npy', X)
-            np.save('y_data.npy', y)
-            print("Массивы данных сохранены в X_data.npy и y_data.npy")
+        # Используем сохраненные массивы, если изображения не менялись
+        X, y = load_or_create_arrays(dataset, df)
         
         print(f"Загружено {len(X)} изображений")
         print(f"Форма данных: {X.shape}")
         
         # Определяем количество классов ДО разделения данных
-        num_classes = len(np.unique(y))
+        num_classes = int(np.count_nonzero(np.bincount(y)))
         print(f"Количество классов: {num_classes}")
         print(f"Диапазон меток: {np.min(y)} - {np.max(y)}")
         
@@ -367,15 +429,7 @@ def continue_training_main():
         df.to_csv('./cards_augmented/augmented_dataset.csv', index=False, encoding='utf-8')
         
         # Загружаем данные
-        if os.path.exists('X_data.npy') and os.path.exists('y_data.npy'):
-            print("Загружаем сохраненные массивы данных...")
-            X = np.load('X_data.npy')
-            y = np.load('y_data.npy')
-        else:
-            print("Загружаем изображения...")
-            X, y = dataset.create_dataset_arrays(df, target_size=(224, 224))
-            np.save('X_data.npy', X)
-            np.save('y_data.npy', y)
+        X, y = load_or_create_arrays(dataset, df)
         
         print(f"Загружено {len(X)} изображений")
         
@@ -396,7 +450,7 @@ def continue_training_main():
         print(f"Тестовая выборка: {len(X_test)}")
         
         # Создаем объект классификатора с загруженной моделью
-        num_classes = len(np.unique(y_train))
+        num_classes = int(np.count_nonzero(np.bincount(y_train)))
         classifier = BerserkCardClassifier(
             input_shape=(224, 224, 3),
             num_classes=num_classes